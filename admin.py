@@ -1,11 +1,50 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from models import db, User, Booking
+from extensions import PRICING_STATS_CACHE_KEY, cache, invalidate_pricing_stats
 from functools import wraps
-from statistics import mean, median
+import re
+from statistics import fmean
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import load_only
 
 admin_bp = Blueprint("admin", __name__)
 
+BOOKINGS_PER_PAGE = 50
+STATS_BATCH_SIZE = 500
+ROLE_COMMIT_BATCH_SIZE = 100
+PRICE_BUCKET_THRESHOLDS = (1000, 1500, 2000)
+PRICE_BUCKET_LABELS = ("Under 1,000", "1,000-1,500", "1,500-2,000", "Over 2,000")
+_ROLE_FIELD_RE = re.compile(r"^role_(\d+)$")
+# Booking-time bands for the pricing stats, in minutes since midnight
+MORNING_START, AFTERNOON_START = 5 * 60, 12 * 60
+EVENING_START, NIGHT_START = 17 * 60, 21 * 60
+PEAK_AM_START, PEAK_AM_END = 6 * 60, 9 * 60
+PEAK_PM_START, PEAK_PM_END = 17 * 60, 20 * 60
+# Columns rendered by the "All Bookings" table; everything else stays deferred.
+BOOKING_TABLE_COLUMNS = (
+    Booking.id,
+    Booking.user_id,
+    Booking.driver_id,
+    Booking.origin,
+    Booking.destination,
+    Booking.status,
+    Booking.price,
+    Booking.payment_method,
+    Booking.payment_by,
+    Booking.date,
+    Booking.driver_rating,
+    Booking.user_rating,
+    Booking.created_at,
+)
+# The per-user booking modals show this many of the latest bookings
+ADMIN_MODAL_BOOKINGS = 20
+MODAL_BOOKING_COLUMNS = BOOKING_TABLE_COLUMNS + (
+    Booking.distance_km,
+    Booking.driver_feedback,
+    Booking.user_feedback,
+)
+
 
 def _parse_time_to_minutes(time_str: str | None):
     if not time_str:
@@ -17,6 +56,45 @@ def _parse_time_to_minutes(time_str: str | None):
         return None
 
 
+def _classify_booking_time(time_str: str | None) -> tuple[str, bool]:
+    """Return the (time band, is peak hour) pair for a stored HH:MM booking time."""
+    total_minutes = _parse_time_to_minutes(time_str)
+    if total_minutes is None:
+        return "Unknown", False
+    if MORNING_START <= total_minutes < AFTERNOON_START:
+        band = "Morning"
+    elif AFTERNOON_START <= total_minutes < EVENING_START:
+        band = "Afternoon"
+    elif EVENING_START <= total_minutes < NIGHT_START:
+        band = "Evening"
+    else:
+        band = "Night"
+    is_peak = (PEAK_AM_START <= total_minutes <= PEAK_AM_END) or (
+        PEAK_PM_START <= total_minutes <= PEAK_PM_END
+    )
+    return band, is_peak
+
+
+def _median_price(price_count: int):
+    """Median of non-null booking prices without loading every row."""
+    priced = Booking.price.isnot(None)
+    if db.engine.dialect.name == "postgresql":
+        return (
+            db.session.query(func.percentile_cont(0.5).within_group(Booking.price))
+            .filter(priced)
+            .scalar()
+        )
+    middle = (
+        db.session.query(Booking.price)
+        .filter(priced)
+        .order_by(Booking.price)
+        .offset((price_count - 1) // 2)
+        .limit(2 - price_count % 2)
+        .all()
+    )
+    return fmean(price for (price,) in middle)
+
+
 def admin_required(f):
     @wraps(f)
     def wrapped(*args, **kwargs):
@@ -28,106 +106,174 @@ def admin_required(f):
     return wrapped
 
 
-@admin_bp.route("/admin")
-@login_required
-@admin_required
-def admin_dashboard():
-    users = User.query.all()
-    bookings = Booking.query.order_by(Booking.created_at.desc()).all()
-    prices = [b.price for b in bookings if b.price is not None]
-    distances = [b.distance_km for b in bookings if b.distance_km]
-    price_per_km = [
-        (b.price / b.distance_km)
-        for b in bookings
-        if b.price is not None and b.distance_km
-    ]
+@cache.cached(timeout=60, key_prefix=PRICING_STATS_CACHE_KEY)
+def compute_pricing_stats():
+    """Aggregate pricing analysis for the admin dashboard across all bookings."""
+    (
+        total_bookings,
+        price_count,
+        avg_price,
+        min_price,
+        max_price,
+        avg_distance,
+        avg_price_per_km,
+    ) = db.session.query(
+        func.count(Booking.id),
+        func.count(Booking.price),
+        func.avg(Booking.price),
+        func.min(Booking.price),
+        func.max(Booking.price),
+        func.avg(func.nullif(Booking.distance_km, 0)),
+        func.avg(Booking.price / func.nullif(Booking.distance_km, 0)),
+    ).one()
+
+    priced = Booking.price.isnot(None)
 
-    def time_band(time_str: str | None) -> str:
-        total_minutes = _parse_time_to_minutes(time_str)
-        if total_minutes is None:
-            return "Unknown"
-        if 5 * 60 <= total_minutes < 12 * 60:
-            return "Morning"
-        if 12 * 60 <= total_minutes < 17 * 60:
-            return "Afternoon"
-        if 17 * 60 <= total_minutes < 21 * 60:
-            return "Evening"
-        return "Night"
-
-    def is_peak_hour(time_str: str | None) -> bool:
-        total_minutes = _parse_time_to_minutes(time_str)
-        if total_minutes is None:
-            return False
-        return (6 * 60 <= total_minutes <= 9 * 60) or (17 * 60 <= total_minutes <= 20 * 60)
-
-    traffic_price_map: dict[str, list[float]] = {}
+    # One grouped pass feeds every per-band breakdown. Raw traffic values differ
+    # only in case/underscores, so keys are normalized and merged here; distinct
+    # booking times are bounded (HH:MM), so each group is classified once.
+    traffic_sum_map: dict[str, float] = {}
     traffic_count_map: dict[str, int] = {}
-    time_price_map: dict[str, list[float]] = {}
-    peak_prices: list[float] = []
-    offpeak_prices: list[float] = []
-    for b in bookings:
-        if b.price is None:
-            continue
-        if b.traffic_level:
-            key = b.traffic_level.title().replace("_", " ")
-            traffic_price_map.setdefault(key, []).append(b.price)
-            traffic_count_map[key] = traffic_count_map.get(key, 0) + 1
-        band = time_band(b.booking_time)
-        time_price_map.setdefault(band, []).append(b.price)
-        if is_peak_hour(b.booking_time):
-            peak_prices.append(b.price)
+    time_sum_map: dict[str, float] = {}
+    time_count_map: dict[str, int] = {}
+    peak_sum = peak_count = offpeak_sum = offpeak_count = 0
+    # One row per distinct (traffic, time) pair; free-form booking times can
+    # make that large, so stream it in batches into the accumulators above.
+    band_rows = (
+        db.session.query(
+            Booking.traffic_level,
+            Booking.booking_time,
+            func.count(),
+            func.sum(Booking.price),
+        )
+        .filter(priced)
+        .group_by(Booking.traffic_level, Booking.booking_time)
+        .yield_per(STATS_BATCH_SIZE)
+    )
+    for traffic_level, booking_time, count, price_sum in band_rows:
+        if traffic_level:
+            key = traffic_level.title().replace("_", " ")
+            traffic_sum_map[key] = traffic_sum_map.get(key, 0) + price_sum
+            traffic_count_map[key] = traffic_count_map.get(key, 0) + count
+        band, is_peak = _classify_booking_time(booking_time)
+        time_sum_map[band] = time_sum_map.get(band, 0) + price_sum
+        time_count_map[band] = time_count_map.get(band, 0) + count
+        if is_peak:
+            peak_sum += price_sum
+            peak_count += count
         else:
-            offpeak_prices.append(b.price)
+            offpeak_sum += price_sum
+            offpeak_count += count
 
     price_buckets = [
-        {"label": "Under 1,000", "min": 0, "max": 1000, "count": 0},
-        {"label": "1,000-1,500", "min": 1000, "max": 1500, "count": 0},
-        {"label": "1,500-2,000", "min": 1500, "max": 2000, "count": 0},
-        {"label": "Over 2,000", "min": 2000, "max": None, "count": 0},
+        {"label": label, "min": low, "max": high, "count": 0}
+        for label, low, high in zip(
+            PRICE_BUCKET_LABELS,
+            (0, *PRICE_BUCKET_THRESHOLDS),
+            (*PRICE_BUCKET_THRESHOLDS, None),
+        )
     ]
-    for price in prices:
-        placed = False
-        for bucket in price_buckets:
-            if bucket["max"] is None:
-                bucket["count"] += 1
-                placed = True
-                break
-            if bucket["min"] <= price < bucket["max"]:
-                bucket["count"] += 1
-                placed = True
-                break
-        if not placed:
-            price_buckets[-1]["count"] += 1
-
-    peak_avg = round(mean(peak_prices), 2) if peak_prices else None
-    offpeak_avg = round(mean(offpeak_prices), 2) if offpeak_prices else None
+    # The CASE yields the bucket's list index directly, so counts need no lookup.
+    bucket = case(
+        *(
+            (Booking.price < threshold, index)
+            for index, threshold in enumerate(PRICE_BUCKET_THRESHOLDS)
+        ),
+        else_=len(PRICE_BUCKET_THRESHOLDS),
+    ).label("bucket")
+    for index, count in (
+        db.session.query(bucket, func.count()).filter(priced).group_by(bucket).all()
+    ):
+        price_buckets[index]["count"] = count
+
+    peak_avg = round(peak_sum / peak_count, 2) if peak_count else None
+    offpeak_avg = round(offpeak_sum / offpeak_count, 2) if offpeak_count else None
     if peak_avg is not None and offpeak_avg:
         peak_premium = round(((peak_avg - offpeak_avg) / offpeak_avg) * 100, 1)
     else:
         peak_premium = None
 
-    pricing_stats = {
-        "total_bookings": len(bookings),
-        "avg_price": round(mean(prices), 2) if prices else None,
-        "median_price": round(median(prices), 2) if prices else None,
-        "min_price": min(prices) if prices else None,
-        "max_price": max(prices) if prices else None,
-        "avg_distance": round(mean(distances), 2) if distances else None,
-        "avg_price_per_km": round(mean(price_per_km), 2) if price_per_km else None,
-        "traffic_avg": {k: round(mean(v), 2) for k, v in traffic_price_map.items()},
+    return {
+        "total_bookings": total_bookings,
+        "avg_price": round(avg_price, 2) if price_count else None,
+        "median_price": round(_median_price(price_count), 2) if price_count else None,
+        "min_price": min_price,
+        "max_price": max_price,
+        "avg_distance": round(avg_distance, 2) if avg_distance is not None else None,
+        "avg_price_per_km": (
+            round(avg_price_per_km, 2) if avg_price_per_km is not None else None
+        ),
+        "traffic_avg": {
+            k: round(v / traffic_count_map[k], 2) for k, v in traffic_sum_map.items()
+        },
         "traffic_counts": traffic_count_map,
-        "time_avg": {k: round(mean(v), 2) for k, v in time_price_map.items()},
+        "time_avg": {k: round(v / time_count_map[k], 2) for k, v in time_sum_map.items()},
         "peak_avg": peak_avg,
         "offpeak_avg": offpeak_avg,
         "peak_premium": peak_premium,
         "price_buckets": price_buckets,
     }
 
+
+def _booking_counts_by(column):
+    """{user id: number of bookings} for Booking.user_id or Booking.driver_id."""
+    return dict(
+        db.session.query(column, func.count(Booking.id))
+        .filter(column.isnot(None))
+        .group_by(column)
+        .all()
+    )
+
+
+def _recent_bookings_by(column):
+    """{user id: newest bookings first}, at most ADMIN_MODAL_BOOKINGS each, in one query."""
+    rank = (
+        func.row_number()
+        .over(partition_by=column, order_by=Booking.id.desc())
+        .label("rank")
+    )
+    ranked = select(Booking.id, rank).where(column.isnot(None)).subquery()
+    rows = (
+        Booking.query.options(load_only(*MODAL_BOOKING_COLUMNS))
+        .join(ranked, ranked.c.id == Booking.id)
+        .filter(ranked.c.rank <= ADMIN_MODAL_BOOKINGS)
+        .order_by(column, Booking.id.desc())
+        .all()
+    )
+    grouped = {}
+    for booking in rows:
+        grouped.setdefault(getattr(booking, column.key), []).append(booking)
+    return grouped
+
+
+@admin_bp.route("/admin")
+@login_required
+@admin_required
+def admin_dashboard():
+    # User cards only need booking counts, and the modals show each user's
+    # latest bookings, so neither walks the full booking collections.  Every
+    # user is in the session, so booking.user / booking.driver resolve from
+    # the identity map without further SQL.
+    users = User.query.all()
+    bookings_page = Booking.query.options(
+        load_only(*BOOKING_TABLE_COLUMNS)
+    ).order_by(Booking.created_at.desc()).paginate(
+        page=request.args.get("page", 1, type=int),
+        per_page=BOOKINGS_PER_PAGE,
+        error_out=False,
+    )
+
     return render_template(
         "admin_dashboard.html",
         users=users,
-        bookings=bookings,
-        pricing_stats=pricing_stats,
+        bookings=bookings_page.items,
+        bookings_page=bookings_page,
+        booking_counts=_booking_counts_by(Booking.user_id),
+        delivery_counts=_booking_counts_by(Booking.driver_id),
+        recent_bookings=_recent_bookings_by(Booking.user_id),
+        recent_deliveries=_recent_bookings_by(Booking.driver_id),
+        modal_limit=ADMIN_MODAL_BOOKINGS,
+        pricing_stats=compute_pricing_stats(),
     )
 
 
@@ -135,10 +281,21 @@ def admin_dashboard():
 @login_required
 @admin_required
 def admin_set_role():
-    for user in User.query.all():
-        field = f"role_{user.id}"
-        if field in request.form:
-            new_role = request.form.get(field)
+    role_changes = {}
+    for field, value in request.form.items():
+        match = _ROLE_FIELD_RE.match(field)
+        if match:
+            role_changes[int(match.group(1))] = value
+
+    user_ids = list(role_changes)
+    # Commit in fixed-size batches so a mass role change never flushes the
+    # whole user table at once, and drop each batch from the session after.
+    for start in range(0, len(user_ids), ROLE_COMMIT_BATCH_SIZE):
+        users = User.query.filter(
+            User.id.in_(user_ids[start : start + ROLE_COMMIT_BATCH_SIZE])
+        ).all()
+        for user in users:
+            new_role = role_changes[user.id]
             if new_role != user.role:
                 user.role = new_role
                 if new_role == "driver":
@@ -146,7 +303,11 @@ def admin_set_role():
                     user.driver_available = True
                 elif new_role != "driver":
                     user.driver_available = False
-    db.session.commit()
+        db.session.commit()
+        for user in users:
+            # Expunging only this batch keeps current_user attached.
+            if user is not current_user._get_current_object():
+                db.session.expunge(user)
     flash("Roles updated.", "success")
     return redirect(url_for("admin.admin_dashboard"))
 
@@ -183,7 +344,10 @@ def admin_driver_reject(user_id):
 @login_required
 @admin_required
 def clear_orders():
-    Booking.query.delete()
+    # Nothing in this request holds Booking objects, so skip reconciling the
+    # session with the deleted rows.
+    Booking.query.delete(synchronize_session=False)
     db.session.commit()
+    invalidate_pricing_stats()
     flash("All orders cleared successfully.", "success")
     return redirect(url_for("admin.admin_dashboard"))
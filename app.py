@@ -1,19 +1,174 @@
+import importlib
 import os
 
 from flask import Flask
 from flask_login import LoginManager
+from sqlalchemy import event, func, inspect, select, text as sa_text, types as sqltypes
 from sqlalchemy.exc import SQLAlchemyError
 
 from config import Config
+from extensions import OrjsonProvider, cache
 from models import User, db
+from uploads import UPLOAD_FOLDER
+
+# (blueprint name, module defining `<name>_bp`), in registration order
+BLUEPRINT_MODULES = (
+    ("auth", "auth"),
+    ("booking", "booking"),
+    ("main", "routes"),
+    ("admin", "admin"),
+    ("driver", "driver"),
+    ("rating", "rating"),
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Put SQLite in WAL mode so booking writes don't block dashboard reads.
+
+    synchronous=NORMAL is crash-safe under WAL and skips an fsync per commit.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _column_sql_type(ctype):
+    """Map a model column type to the DDL type used for ALTER TABLE ADD COLUMN."""
+    if isinstance(ctype, sqltypes.Integer):
+        return "INTEGER"
+    if isinstance(ctype, sqltypes.Float):
+        return "REAL"
+    if isinstance(ctype, sqltypes.String):
+        return f"VARCHAR({ctype.length})" if getattr(ctype, "length", None) else "VARCHAR"
+    if isinstance(ctype, sqltypes.Text):
+        return "TEXT"
+    if isinstance(ctype, sqltypes.DateTime):
+        return "DATETIME"
+    return "TEXT"
+
+
+def _backfill_rating_totals(conn):
+    """Fill User.rating_sum/rating_count from existing Rating rows."""
+    from models import Rating
+
+    received = Rating.rated_id == User.id
+    conn.execute(
+        User.__table__.update().values(
+            rating_sum=select(func.coalesce(func.sum(Rating.rating), 0))
+            .where(received)
+            .scalar_subquery(),
+            rating_count=select(func.count(Rating.id)).where(received).scalar_subquery(),
+        )
+    )
+
+
+def _auto_migrate(app):
+    """Add columns and indexes the models declare but an existing DB lacks.
+
+    Also drops ix_* indexes the models no longer declare.
+
+    Development convenience only (AUTO_MIGRATE); there is no migration history.
+    """
+    from models import Booking, Rating, SiteFeedback
+
+    models_to_check = [Booking, User, Rating, SiteFeedback]
+
+    # One connection for the whole pass; each ALTER commits on its own
+    # so a single failure doesn't abort the remaining columns.
+    added_columns = set()
+    with db.engine.connect() as conn:
+        inspector = inspect(conn)
+        for m in models_to_check:
+            tname = m.__table__.name
+            try:
+                existing_cols = set(c["name"] for c in inspector.get_columns(tname))
+            except SQLAlchemyError:
+                conn.rollback()
+                existing_cols = set()
+
+            for col in m.__table__.columns:
+                if col.name in existing_cols:
+                    continue
+
+                sqltype = _column_sql_type(col.type)
+                stmt = f"ALTER TABLE {tname} ADD COLUMN {col.name} {sqltype};"
+                try:
+                    conn.execute(sa_text(stmt))
+                    conn.commit()
+                    added_columns.add((tname, col.name))
+                    app.logger.info(
+                        "Added missing column to %s: %s %s", tname, col.name, sqltype
+                    )
+                except SQLAlchemyError as e:
+                    conn.rollback()
+                    app.logger.warning(
+                        "Could not add column %s to %s: %s", col.name, tname, e
+                    )
+
+            # create_all() only indexes brand-new tables, so add any
+            # index declared on the model that an older DB lacks.
+            for index in m.__table__.indexes:
+                try:
+                    index.create(conn, checkfirst=True)
+                    conn.commit()
+                except SQLAlchemyError as e:
+                    conn.rollback()
+                    app.logger.warning(
+                        "Could not create index %s on %s: %s", index.name, tname, e
+                    )
+
+            # Drop ix_* indexes the model no longer declares, e.g. single-
+            # column ones since folded into a composite's leading column.
+            declared = {index.name for index in m.__table__.indexes}
+            try:
+                existing_indexes = inspector.get_indexes(tname)
+            except SQLAlchemyError:
+                conn.rollback()
+                existing_indexes = []
+            for entry in existing_indexes:
+                name = entry["name"]
+                if not name or not name.startswith("ix_") or name in declared:
+                    continue
+                try:
+                    conn.execute(sa_text(f"DROP INDEX {name}"))
+                    conn.commit()
+                    app.logger.info("Dropped retired index on %s: %s", tname, name)
+                except SQLAlchemyError as e:
+                    conn.rollback()
+                    app.logger.warning(
+                        "Could not drop index %s on %s: %s", name, tname, e
+                    )
+
+        # Rating totals on User are derived data; compute them for users
+        # that existed before the columns did.
+        user_table = User.__table__.name
+        if {(user_table, "rating_sum"), (user_table, "rating_count")} & added_columns:
+            try:
+                _backfill_rating_totals(conn)
+                conn.commit()
+            except SQLAlchemyError as e:
+                conn.rollback()
+                app.logger.warning("Could not backfill rating totals: %s", e)
 
 
 def create_app():
     """Create and configure the Flask application."""
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.json = OrjsonProvider(app)
 
     db.init_app(app)
+    cache.init_app(app)
+
+    with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            event.listen(db.engine, "connect", _set_sqlite_pragmas)
+
+    # Upload handlers write straight into this folder, so create it once here
+    # rather than on every request.
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
     # Auto-create database tables and handle migrations (development mode)
     if app.config.get("AUTO_CREATE_DB", True):
@@ -23,69 +178,8 @@ def create_app():
                 app.logger.info("Database tables ensured/created.")
 
                 # Auto-add missing columns for development
-                from sqlalchemy import inspect, text as sa_text, types as sqltypes
-
-                from models import Booking, SiteFeedback
-
-                engine = db.engine
-                inspector = inspect(engine)
-                models_to_check = [Booking, User, SiteFeedback]
-                existing_cols_map = {}
-
-                for m in models_to_check:
-                    tname = m.__table__.name
-                    try:
-                        cols = inspector.get_columns(tname)
-                        existing_cols_map[tname] = set(c["name"] for c in cols)
-                    except SQLAlchemyError:
-                        existing_cols_map[tname] = set()
-
-                for m in models_to_check:
-                    tname = m.__table__.name
-                    existing_cols = existing_cols_map.get(tname, set())
-                    for col in m.__table__.columns:
-                        if col.name in existing_cols:
-                            continue
-
-                        ctype = col.type
-                        if isinstance(ctype, sqltypes.Integer):
-                            sqltype = "INTEGER"
-                        elif isinstance(ctype, sqltypes.Float):
-                            sqltype = "REAL"
-                        elif isinstance(ctype, sqltypes.String):
-                            sqltype = (
-                                f"VARCHAR({ctype.length})"
-                                if getattr(ctype, "length", None)
-                                else "VARCHAR"
-                            )
-                        elif isinstance(ctype, sqltypes.Text):
-                            sqltype = "TEXT"
-                        elif isinstance(ctype, sqltypes.DateTime):
-                            sqltype = "DATETIME"
-                        else:
-                            sqltype = "TEXT"
-
-                        stmt = f"ALTER TABLE {tname} ADD COLUMN {col.name} {sqltype};"
-                        try:
-                            with engine.connect() as conn:
-                                conn.execute(sa_text(stmt))
-                                app.logger.info(
-                                    "Added missing column to %s: %s %s",
-                                    tname,
-                                    col.name,
-                                    sqltype,
-                                )
-                        except SQLAlchemyError as e:
-                            app.logger.warning(
-                                "Could not add column %s to %s: %s", col.name, tname, e
-                            )
-
-                # Ensure upload folder exists
-                upload_folder = os.path.join(
-                    os.path.dirname(__file__), "static", "uploads"
-                )
-                os.makedirs(upload_folder, exist_ok=True)
-                app.logger.info("Ensured upload folder exists: %s", upload_folder)
+                if app.config.get("AUTO_MIGRATE", False):
+                    _auto_migrate(app)
 
             except SQLAlchemyError as e:
                 app.logger.error("Failed to create DB tables: %s", e)
@@ -99,20 +193,22 @@ def create_app():
     def load_user(user_id):
         return User.query.get(int(user_id))
 
-    # Register blueprints
-    from admin import admin_bp
-    from auth import auth_bp
-    from booking import booking_bp
-    from driver import driver_bp
-    from rating import rating_bp
-    from routes import main_bp
-
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(booking_bp)
-    app.register_blueprint(main_bp)
-    app.register_blueprint(admin_bp)
-    app.register_blueprint(driver_bp)
-    app.register_blueprint(rating_bp)
+    # Train the pricing model at startup instead of on the first estimate
+    if app.config.get("PREWARM_PRICING_MODEL", False):
+        import pricing_module
+
+        pricing_module.warm_up()
+
+    # Register blueprints, skipping disabled ones. auth is required because
+    # login_manager redirects anonymous users to auth.login.
+    disabled = app.config.get("DISABLED_BLUEPRINTS", set())
+    if "auth" in disabled:
+        raise ValueError("DISABLED_BLUEPRINTS cannot include 'auth'")
+    for name, module_name in BLUEPRINT_MODULES:
+        if name in disabled:
+            continue
+        module = importlib.import_module(module_name)
+        app.register_blueprint(getattr(module, f"{name}_bp"))
 
     return app
 
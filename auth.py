@@ -1,3 +1,4 @@
+import hmac
 import os
 
 from flask import (
@@ -14,6 +15,7 @@ from flask_login import current_user, login_required, login_user, logout_user
 from flask_wtf import FlaskForm
 from models import User, db
 from sqlalchemy.exc import OperationalError
+from uploads import UPLOAD_BUFFER_SIZE, UPLOAD_FOLDER, save_upload
 from werkzeug.utils import secure_filename
 from wtforms import BooleanField, FileField, PasswordField, StringField, SubmitField
 from wtforms.validators import DataRequired, Email, EqualTo, Length
@@ -51,8 +53,18 @@ class SignupForm(FlaskForm):
     submit = SubmitField("Sign Up")
 
 
+def _username_or_email_taken(username, email):
+    """Check for an existing account with an EXISTS query instead of loading a row."""
+    return db.session.query(
+        User.query.filter((User.username == username) | (User.email == email)).exists()
+    ).scalar()
+
+
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
+    if request.method == "GET":
+        # Nothing was submitted, so skip binding request data to the form.
+        return render_template("login.html", form=LoginForm(formdata=None))
     form = LoginForm()
     if form.validate_on_submit():
         try:
@@ -71,12 +83,12 @@ def login():
 
 @auth_bp.route("/signup", methods=["GET", "POST"])
 def signup():
+    if request.method == "GET":
+        return render_template("signup.html", form=SignupForm(formdata=None))
     form = SignupForm()
     if form.validate_on_submit():
         try:
-            if User.query.filter(
-                (User.username == form.username.data) | (User.email == form.email.data)
-            ).first():
+            if _username_or_email_taken(form.username.data, form.email.data):
                 flash("Username or email already exists", "warning")
                 return redirect(url_for("auth.signup"))
         except OperationalError:
@@ -91,19 +103,6 @@ def signup():
         except ValueError:
             user.age = None
 
-        def save_upload(file_field, prefix):
-            f = file_field.data
-            if not f or not getattr(f, "filename", None):
-                return None
-            upload_folder = os.path.join(os.path.dirname(__file__), "static", "uploads")
-            os.makedirs(upload_folder, exist_ok=True)
-            filename = secure_filename(f.filename)
-            name, ext = os.path.splitext(filename)
-            safe_name = f"{prefix}_{name}{ext}"
-            dest = os.path.join(upload_folder, safe_name)
-            f.save(dest)
-            return f"/static/uploads/{safe_name}"
-
         if form.driver.data:
             user.role = "user"
             user.driver_status = "pending"
@@ -112,15 +111,14 @@ def signup():
             user.vehicle_brand = form.vehicle_brand.data
             user.vehicle_plate = form.vehicle_plate.data
             user.driver_license_path = save_upload(
-                form.driver_license, f"license_{user.username}"
+                form.driver_license.data, f"license_{user.username}"
             )
             user.driver_bluebook_path = save_upload(
-                form.driver_bluebook, f"bluebook_{user.username}"
+                form.driver_bluebook.data, f"bluebook_{user.username}"
             )
             user.driver_photo_path = save_upload(
-                form.driver_photo, f"driver_{user.username}"
+                form.driver_photo.data, f"driver_{user.username}"
             )
-            user.vehicle_info = f"{(form.vehicle_brand.data or '').strip()} {(form.vehicle_name.data or '').strip()}".strip()
         else:
             user.role = "user"
         user.set_password(form.password.data)
@@ -162,11 +160,9 @@ def edit_profile():
 
         f = request.files.get("profile_pic")
         if f and f.filename:
-            upload_folder = os.path.join(os.path.dirname(__file__), "static", "uploads")
-            os.makedirs(upload_folder, exist_ok=True)
             filename = secure_filename(f.filename)
-            dest = os.path.join(upload_folder, filename)
-            f.save(dest)
+            dest = os.path.join(UPLOAD_FOLDER, filename)
+            f.save(dest, buffer_size=UPLOAD_BUFFER_SIZE)
             current_user.profile_pic = f"/static/uploads/{filename}"
 
         db.session.commit()
@@ -187,16 +183,14 @@ def admin_signup():
         email = request.form.get("email")
         password = request.form.get("password")
         try:
-            if User.query.filter(
-                (User.username == username) | (User.email == email)
-            ).first():
+            if _username_or_email_taken(username, email):
                 flash("Username or email already exists", "warning")
                 return redirect(url_for("auth.admin_signup"))
         except OperationalError:
             flash(DB_INIT_ERROR_MSG, "danger")
             return redirect(url_for("main.home"))
 
-        if token != token_required:
+        if not hmac.compare_digest((token or "").encode(), token_required.encode()):
             flash("Invalid registration token", "danger")
             return redirect(url_for("auth.admin_signup"))
         user = User(username=username, email=email, role="admin")
@@ -1,24 +1,49 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for
+from flask import (
+    Blueprint,
+    render_template,
+    request,
+    jsonify,
+    redirect,
+    url_for,
+    make_response,
+    session,
+)
 from flask_login import login_required, current_user
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import joinedload
+from extensions import invalidate_pricing_stats
 from models import Booking, db
 import pricing_module as pm
+import functools
+import hashlib
 import math
+import os
+import numpy as np
 
 booking_bp = Blueprint("booking", __name__)
 
 DEFAULT_DISTANCE_KM = 1.0
-DEFAULT_COMPARISON_DISTANCES = [2.0, 5.0, 8.0, 12.0, 15.0]
+EARTH_RADIUS_KM = 6371.0
+DEG_TO_RAD = math.pi / 180.0
+# Changes whenever the detail page's templates do, so a deploy invalidates ETags
+BOOKING_DETAIL_ETAG_SALT = ":".join(
+    str(os.stat(os.path.join(os.path.dirname(__file__), "templates", name)).st_mtime_ns)
+    for name in ("base.html", "booking_detail.html")
+)
+PEAK_HOURS = (8, 9, 10, 16, 17, 18, 19)
+# Bit h is set when hour h is a peak hour
+PEAK_HOUR_MASK = sum(1 << hour for hour in PEAK_HOURS)
+DEFAULT_COMPARISON_DISTANCES = (2.0, 5.0, 8.0, 12.0, 15.0)
 
 
 def _haversine(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return max(R * c, 1.0)
+    sin_dphi = math.sin((lat2 - lat1) * DEG_TO_RAD * 0.5)
+    sin_dlambda = math.sin((lon2 - lon1) * DEG_TO_RAD * 0.5)
+    a = sin_dphi * sin_dphi + (
+        math.cos(lat1 * DEG_TO_RAD) * math.cos(lat2 * DEG_TO_RAD) * sin_dlambda * sin_dlambda
+    )
+    # asin form of the central angle; a is clamped against rounding above 1
+    return max(2.0 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0))), 1.0)
 
 
 def _to_float(value):
@@ -41,22 +66,49 @@ def _compute_distance(origin_lat, origin_lng, dest_lat, dest_lng, distance_km):
     return DEFAULT_DISTANCE_KM
 
 
+def _parse_route(data):
+    """Read both endpoints and the trip distance from a form or JSON payload.
+
+    Returns (origin_lat, origin_lng, dest_lat, dest_lng, distance_km).
+    """
+    origin_lat = _to_float(data.get("origin_lat"))
+    origin_lng = _to_float(data.get("origin_lng"))
+    dest_lat = _to_float(data.get("dest_lat"))
+    dest_lng = _to_float(data.get("dest_lng"))
+    distance_km = _compute_distance(
+        origin_lat, origin_lng, dest_lat, dest_lng, data.get("distance_km")
+    )
+    return origin_lat, origin_lng, dest_lat, dest_lng, distance_km
+
+
 def _parse_optional_float(value):
     parsed_value = _to_float(value)
     return parsed_value if parsed_value is not None else None
 
 
-def _is_peak_hour(time_of_day):
-    if isinstance(time_of_day, str) and ":" in time_of_day:
-        try:
-            h = int(time_of_day.split(":")[0])
-            return (8 <= h <= 10) or (16 <= h <= 19)
-        except (TypeError, ValueError):
-            return False
-    return False
+def _is_peak_hour(hour):
+    """1 if the hour falls in the morning or evening rush, else 0."""
+    if hour is None or hour < 0:
+        return 0
+    return (PEAK_HOUR_MASK >> hour) & 1
 
 
+def _time_context(time_of_day):
+    """Parse the booking time once into (time period for pricing, is_peak flag)."""
+    hour = pm.parse_hour(time_of_day)
+    is_peak = _is_peak_hour(hour)
+    if hour is None:
+        return time_of_day, is_peak
+    return pm.time_period_for_hour(hour), is_peak
+
+
+@functools.lru_cache(maxsize=256)
 def _parse_distances(raw_value):
+    """Parse a comma-separated distance list into a sorted tuple of unique km values.
+
+    The comparison page is mostly requested with the same few query strings,
+    so parsed results are memoized; tuples keep the shared values immutable.
+    """
     if not raw_value:
         return DEFAULT_COMPARISON_DISTANCES
 
@@ -75,7 +127,7 @@ def _parse_distances(raw_value):
     if not parsed:
         return DEFAULT_COMPARISON_DISTANCES
 
-    return sorted(set(parsed))
+    return tuple(sorted(set(parsed)))
 
 
 @booking_bp.route("/book", methods=["GET", "POST"])
@@ -85,34 +137,24 @@ def book():
         form = request.form
         origin = form.get("origin", "")
         destination = form.get("destination", "")
-        origin_lat = _to_float(form.get("origin_lat"))
-        origin_lng = _to_float(form.get("origin_lng"))
-        dest_lat = _to_float(form.get("dest_lat"))
-        dest_lng = _to_float(form.get("dest_lng"))
-        distance_km = _compute_distance(
-            origin_lat,
-            origin_lng,
-            dest_lat,
-            dest_lng,
-            form.get("distance_km"),
-        )
+        origin_lat, origin_lng, dest_lat, dest_lng, distance_km = _parse_route(form)
 
         vehicle_type = form.get("vehicle_type", "medium_vehicle")
         time_of_day = form.get("time_of_day", "14:00")
         traffic_override = form.get("traffic_level_override")
         traffic_multiplier = form.get("traffic_multiplier_override")
 
-        is_peak = 1 if _is_peak_hour(time_of_day) else 0
+        time_period, is_peak = _time_context(time_of_day)
 
         traffic_level = traffic_override or "medium"
         price_details = pm.estimate_price_details(
             distance_km,
             vehicle_type,
             traffic_level,
-            time_of_day,
+            time_period,
             is_peak,
         )
-        price = int(round(price_details.get("final_price", 0)))
+        price = int(round(price_details["final_price"]))
 
         booking = Booking(
             user_id=current_user.id,
@@ -134,16 +176,51 @@ def book():
 
         db.session.add(booking)
         db.session.commit()
+        invalidate_pricing_stats()
         return redirect(url_for("booking.booking_detail", booking_id=booking.id))
 
     return render_template("booking.html", ongoing_booking=None)
 
 
+def _row_state(obj):
+    """Every mapped column of obj, so new template fields can't go stale."""
+    if obj is None:
+        return None
+    return tuple(getattr(obj, attr.key) for attr in sa_inspect(obj).mapper.column_attrs)
+
+
+def _booking_detail_etag(booking):
+    """Validator over the rows booking_detail.html and base.html's navbar render.
+
+    The models carry no updated_at/version column, so the tag hashes the
+    full column state of the booking, its driver and the viewer. A template
+    that starts reading another object must add it here.
+    """
+    state = (
+        BOOKING_DETAIL_ETAG_SALT,
+        _row_state(current_user._get_current_object()),
+        _row_state(booking),
+        _row_state(booking.driver),
+    )
+    return hashlib.blake2b(repr(state).encode(), digest_size=8).hexdigest()
+
+
 @booking_bp.route("/booking/<int:booking_id>")
 @login_required
 def booking_detail(booking_id):
-    booking = Booking.query.get_or_404(booking_id)
-    return render_template("booking_detail.html", booking=booking)
+    booking = Booking.query.options(joinedload(Booking.driver)).get_or_404(booking_id)
+    etag = _booking_detail_etag(booking)
+    # Queued flash messages are part of the page, so those views always render
+    if "_flashes" not in session and etag in request.if_none_match:
+        response = make_response("", 304)
+    else:
+        response = make_response(render_template("booking_detail.html", booking=booking))
+    response.set_etag(etag)
+    # Per-user page: never shared caches, and always revalidated so status
+    # changes show up immediately.
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 
 @booking_bp.route("/price-distance")
@@ -154,48 +231,36 @@ def price_distance_comparison():
     time_of_day = request.args.get("time_of_day", "14:00")
     distances = _parse_distances(request.args.get("distances"))
 
-    is_peak = 1 if _is_peak_hour(time_of_day) else 0
-
-    raw_prices = []
-    for distance in distances:
-        raw_price = round(
-            float(
-                pm.predict_price(
-                    distance,
-                    vehicle_type,
-                    traffic_level,
-                    time_of_day,
-                    is_peak,
-                )
+    time_period, is_peak = _time_context(time_of_day)
+
+    # One model query for the whole comparison; only the distance varies
+    raw_prices = np.round(
+        np.asarray(
+            pm.predict_prices(
+                distances,
+                vehicle_type,
+                traffic_level,
+                time_period,
+                is_peak,
             ),
-            2,
-        )
-        raw_prices.append(raw_price)
-
-    monotonic_prices = []
-    running_max = None
-    for price in raw_prices:
-        if running_max is None:
-            running_max = price
-        else:
-            running_max = max(running_max, price)
-        monotonic_prices.append(running_max)
-
-    comparisons = []
-    previous_price = None
-    for distance, price in zip(distances, monotonic_prices):
-        change_from_previous = None
-        if previous_price is not None:
-            change_from_previous = round(price - previous_price, 2)
-
-        comparisons.append(
-            {
-                "distance_km": distance,
-                "price": price,
-                "change_from_previous": change_from_previous,
-            }
+            dtype=np.float64,
+        ),
+        2,
+    )
+    # Prices never drop as distance grows: running max, then step changes
+    monotonic_prices = np.maximum.accumulate(raw_prices)
+    changes = [None] + np.round(np.diff(monotonic_prices), 2).tolist()
+
+    comparisons = [
+        {
+            "distance_km": distance,
+            "price": price,
+            "change_from_previous": change_from_previous,
+        }
+        for distance, price, change_from_previous in zip(
+            distances, monotonic_prices.tolist(), changes
         )
-        previous_price = price
+    ]
 
     return render_template(
         "price_distance.html",
@@ -210,18 +275,12 @@ def price_distance_comparison():
 
 @booking_bp.route("/api/price-estimate", methods=["POST"])
 def api_price_estimate():
-    data = request.get_json(force=True) or {}
-    origin_lat = _to_float(data.get("origin_lat"))
-    origin_lng = _to_float(data.get("origin_lng"))
-    dest_lat = _to_float(data.get("dest_lat"))
-    dest_lng = _to_float(data.get("dest_lng"))
-    distance_km = _compute_distance(
-        origin_lat,
-        origin_lng,
-        dest_lat,
-        dest_lng,
-        data.get("distance_km"),
-    )
+    # A malformed or non-object body gets the default estimate rather than
+    # an error raised through Werkzeug's BadRequest handling.
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    origin_lat, origin_lng, dest_lat, dest_lng, distance_km = _parse_route(data)
 
     vehicle_type = data.get("vehicle_type") or "medium_vehicle"
     time_of_day = data.get("time_of_day") or "14:00"
@@ -229,38 +288,29 @@ def api_price_estimate():
     traffic_multiplier = data.get("traffic_multiplier_override")
     traffic_level = traffic_override or "medium"
 
-    is_peak = 1 if _is_peak_hour(time_of_day) else 0
+    time_period, is_peak = _time_context(time_of_day)
 
     price_details = pm.estimate_price_details(
         distance_km,
         vehicle_type,
         traffic_level,
-        time_of_day,
+        time_period,
         is_peak,
     )
-    breakdown = price_details.get("breakdown", {})
-
     resp = {
-        "price": price_details.get("final_price"),
+        "price": price_details["final_price"],
         "distance_km": float(distance_km),
         "traffic_level": traffic_level,
         "traffic_multiplier": _parse_optional_float(traffic_multiplier) or 1.0,
         "time_level": "peak" if is_peak else "off-peak",
         "origin_zone": data.get("origin_zone") or "unknown",
         "dest_zone": data.get("dest_zone") or "unknown",
+        # estimate_price_details always returns every breakdown key, so
+        # unpack it whole rather than re-reading each field with a default.
         "price_breakdown": {
-            "distance_fare": breakdown.get("distance_fare", 0),
-            "fuel_maintenance": breakdown.get("fuel_maintenance", 0),
-            "labor": breakdown.get("labor", 0),
-            "service_fee": breakdown.get("service_fee", 0),
-            "subtotal_before_multiplier": breakdown.get("subtotal_before_multiplier", 0),
-            "traffic_factor": breakdown.get("traffic_factor", 1),
-            "peak_factor": breakdown.get("peak_factor", 1),
-            "time_factor": breakdown.get("time_factor", 1),
-            "total_multiplier": breakdown.get("total_multiplier", 1),
-            "deterministic_total": breakdown.get("deterministic_total", 0),
-            "fair_floor": price_details.get("fair_floor", 0),
-            "context_factor": price_details.get("context_factor", 1),
+            **price_details["breakdown"],
+            "fair_floor": price_details["fair_floor"],
+            "context_factor": price_details["context_factor"],
         },
     }
 
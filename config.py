@@ -9,4 +9,18 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", f"sqlite:///{_DB_PATH}")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     AUTO_CREATE_DB = os.environ.get("AUTO_CREATE_DB", "True") in ("True", "true", "1")
+    AUTO_MIGRATE = os.environ.get("AUTO_MIGRATE", "True") in ("True", "true", "1")
     ADMIN_REG_CODE = os.environ.get("ADMIN_REG_CODE")
+    # SimpleCache lives in one process: with several workers an invalidation
+    # only clears the worker that handled the write, and the others serve the
+    # cached value until its timeout. gunicorn.conf.py therefore defaults to
+    # FileSystemCache, which every worker on the host shares.
+    CACHE_TYPE = os.environ.get("CACHE_TYPE", "SimpleCache")
+    CACHE_DIR = os.environ.get("CACHE_DIR", os.path.join(_BASE_DIR, "instance", "cache"))
+    PREWARM_PRICING_MODEL = os.environ.get("PREWARM_PRICING_MODEL", "True") in ("True", "true", "1")
+    # Comma-separated blueprint names to skip, e.g. "admin,driver"
+    DISABLED_BLUEPRINTS = {
+        name.strip()
+        for name in os.environ.get("DISABLED_BLUEPRINTS", "").split(",")
+        if name.strip()
+    }
@@ -1,12 +1,34 @@
-import os
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
+from sqlalchemy.orm import load_only, selectinload
 from models import db, User, Booking
+from uploads import save_upload
 from functools import wraps
 
 driver_bp = Blueprint("driver", __name__)
 
+ACTIVE_STATUSES = ("arrived", "accepted", "in_transit", "delivered")
+# Columns the dashboard cards render; route geometry and feedback stay deferred.
+DASHBOARD_BOOKING_COLUMNS = (
+    Booking.id,
+    Booking.user_id,
+    Booking.driver_id,
+    Booking.origin,
+    Booking.origin_lat,
+    Booking.origin_lng,
+    Booking.destination,
+    Booking.dest_lat,
+    Booking.dest_lng,
+    Booking.date,
+    Booking.status,
+    Booking.price,
+    Booking.payment_method,
+    Booking.payment_by,
+    Booking.payment_received,
+    Booking.driver_rating,
+    Booking.user_rating,
+)
+
 
 def driver_required(f):
     @wraps(f)
@@ -33,26 +55,20 @@ def driver_or_admin_required(f):
     return wrapped
 
 
-def _save_upload(file_storage, prefix):
-    if not file_storage or not getattr(file_storage, "filename", None):
-        return None
-    upload_folder = os.path.join(os.path.dirname(__file__), "static", "uploads")
-    os.makedirs(upload_folder, exist_ok=True)
-    filename = secure_filename(file_storage.filename)
-    name, ext = os.path.splitext(filename)
-    safe_name = f"{prefix}_{name}{ext}"
-    dest = os.path.join(upload_folder, safe_name)
-    file_storage.save(dest)
-    return f"/static/uploads/{safe_name}"
-
-
 @driver_bp.route("/driver")
 @login_required
 def driver_dashboard():
+    # Cards show each booking's customer and driver; fetch them per list in
+    # one IN query each instead of lazily per card.
+    dashboard_query = Booking.query.options(
+        load_only(*DASHBOARD_BOOKING_COLUMNS),
+        selectinload(Booking.user),
+        selectinload(Booking.driver),
+    )
     if current_user.role == "admin":
-        pending_bookings = Booking.query.filter_by(status="pending").all()
-        accepted_bookings = Booking.query.filter(
-            Booking.status.in_(["arrived", "accepted", "in_transit", "delivered"])
+        pending_bookings = dashboard_query.filter_by(status="pending").all()
+        accepted_bookings = dashboard_query.filter(
+            Booking.status.in_(ACTIVE_STATUSES)
         ).all()
         return render_template(
             "driver_dashboard.html",
@@ -63,10 +79,10 @@ def driver_dashboard():
         )
 
     if current_user.role == "driver":
-        pending_bookings = Booking.query.filter_by(status="pending").all()
-        accepted_bookings = Booking.query.filter(
+        pending_bookings = dashboard_query.filter_by(status="pending").all()
+        accepted_bookings = dashboard_query.filter(
             Booking.driver_id == current_user.id,
-            Booking.status.in_(["arrived", "accepted", "in_transit", "delivered"]),
+            Booking.status.in_(ACTIVE_STATUSES),
         ).all()
         return render_template(
             "driver_dashboard.html",
@@ -100,24 +116,23 @@ def driver_reapply():
     current_user.vehicle_brand = request.form.get("vehicle_brand")
     current_user.vehicle_plate = request.form.get("vehicle_plate")
     current_user.driver_license_path = (
-        _save_upload(
+        save_upload(
             request.files.get("driver_license"), f"license_{current_user.username}"
         )
         or current_user.driver_license_path
     )
     current_user.driver_bluebook_path = (
-        _save_upload(
+        save_upload(
             request.files.get("driver_bluebook"), f"bluebook_{current_user.username}"
         )
         or current_user.driver_bluebook_path
     )
     current_user.driver_photo_path = (
-        _save_upload(
+        save_upload(
             request.files.get("driver_photo"), f"driver_{current_user.username}"
         )
         or current_user.driver_photo_path
     )
-    current_user.vehicle_info = f"{(current_user.vehicle_brand or '').strip()} {(current_user.vehicle_name or '').strip()}".strip()
     current_user.driver_status = "pending"
     current_user.driver_feedback = None
     current_user.role = "user"
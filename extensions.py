@@ -0,0 +1,49 @@
+import orjson
+from flask.json.provider import DefaultJSONProvider
+from flask_caching import Cache
+
+cache = Cache()
+
+# Cached query results shared by several blueprints; the keys and invalidators
+# live here so no blueprint has to import another one.
+PRICING_STATS_CACHE_KEY = "admin_pricing_stats"
+HOME_FEEDBACKS_CACHE_KEY = "home_site_feedbacks"
+
+
+def invalidate_pricing_stats():
+    cache.delete(PRICING_STATS_CACHE_KEY)
+
+
+def invalidate_site_feedbacks():
+    cache.delete(HOME_FEEDBACKS_CACHE_KEY)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Datetimes are passed through to Flask's default handler so they keep the
+    HTTP date format; NumPy values from the pricing model serialize directly.
+    """
+
+    option = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_SERIALIZE_NUMPY
+        | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
+    def dumps(self, obj, **kwargs):
+        option = self.option
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(
+            obj, default=kwargs.get("default", self.default), option=option
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        # orjson has no object_hook; the session serializer needs one to
+        # restore tagged values (tuples, bytes, Markup), so defer to json then.
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
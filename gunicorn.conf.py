@@ -0,0 +1,31 @@
+# Production server settings: gunicorn -c gunicorn.conf.py
+import multiprocessing
+import os
+
+wsgi_app = "app:create_app()"
+
+# Workers are separate processes, so cache invalidations must go through a
+# store they all share; a per-process SimpleCache would stay stale elsewhere.
+os.environ.setdefault("CACHE_TYPE", "FileSystemCache")
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+# Password hashing in login/signup is CPU-bound and holds a sync worker for
+# the whole request; threaded workers let other requests (and other logins)
+# proceed while one request is hashing.
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# Build the app (and warm the pricing model) once in the master so workers
+# share the loaded model's memory copy-on-write instead of each loading it.
+preload_app = True
+
+
+def post_fork(server, worker):
+    # The master opened DB connections while creating tables and migrating;
+    # drop them from each worker's pool without closing the parent's sockets.
+    from models import db
+
+    with server.app.wsgi().app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
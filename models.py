@@ -1,5 +1,6 @@
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 from werkzeug.security import check_password_hash, generate_password_hash
 
 db = SQLAlchemy()
@@ -25,6 +26,9 @@ class User(db.Model, UserMixin):
     driver_photo_path = db.Column(db.String(255))
     vehicle_info = db.Column(db.String(255))
     driver_available = db.Column(db.Boolean, default=False)
+    # Running totals of ratings received, kept in step by the Rating events below
+    rating_sum = db.Column(db.Integer, default=0)
+    rating_count = db.Column(db.Integer, default=0)
     bookings = db.relationship(
         "Booking", back_populates="user", foreign_keys="Booking.user_id", lazy=True
     )
@@ -35,19 +39,39 @@ class User(db.Model, UserMixin):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    @validates("vehicle_brand", "vehicle_name")
+    def _sync_vehicle_info(self, key, value):
+        """Rebuild the "brand name" summary whenever either part is assigned"""
+        brand = value if key == "vehicle_brand" else self.vehicle_brand
+        name = value if key == "vehicle_name" else self.vehicle_name
+        self.vehicle_info = f"{(brand or '').strip()} {(name or '').strip()}".strip()
+        return value
+
     def get_average_rating(self):
         """Calculate average rating for this user from all ratings received"""
-        ratings = Rating.query.filter_by(rated_id=self.id).all()
-        if not ratings:
-            return 0
-        return sum(r.rating for r in ratings) / len(ratings)
+        return self.get_rating_summary()[0]
 
     def get_total_ratings(self):
         """Get total number of ratings received"""
-        return Rating.query.filter_by(rated_id=self.id).count()
+        return self.rating_count or 0
+
+    def get_rating_summary(self):
+        """Return (average rating, number of ratings) from the running totals"""
+        total = self.rating_count or 0
+        if not total:
+            return 0, 0
+        return (self.rating_sum or 0) / total, total
 
 
 class Booking(db.Model):
+    # Driver dashboards list a driver's bookings by status on every load, and
+    # user stats count a customer's delivered bookings. Their leading columns
+    # also serve plain driver_id/user_id lookups.
+    __table_args__ = (
+        db.Index("ix_booking_driver_status", "driver_id", "status"),
+        db.Index("ix_booking_user_status", "user_id", "status"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     user = db.relationship("User", foreign_keys=[user_id], back_populates="bookings")
@@ -58,14 +82,14 @@ class Booking(db.Model):
     dest_lat = db.Column(db.Float)
     dest_lng = db.Column(db.Float)
     date = db.Column(db.String(40))
-    price = db.Column(db.Integer)
+    price = db.Column(db.Integer, index=True)
     driver_id = db.Column(db.Integer, db.ForeignKey("user.id"))
     driver = db.relationship("User", foreign_keys=[driver_id], backref="assigned_bookings")
-    status = db.Column(db.String(40), default="pending")
+    status = db.Column(db.String(40), default="pending", index=True)
     delivered_at = db.Column(db.DateTime)
     distance_km = db.Column(db.Float)
     route_geojson = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
     payment_method = db.Column(db.String(20), default="cash")
     payment_by = db.Column(db.String(20), default="sender")
     payment_received = db.Column(db.Boolean, default=False)
@@ -83,6 +107,10 @@ class Booking(db.Model):
 class Rating(db.Model):
     """Store ratings for users and drivers to track overall performance"""
 
+    # The ratings page lists a user's ratings newest first; the leading
+    # column also serves plain rated_id lookups
+    __table_args__ = (db.Index("ix_rating_rated_created", "rated_id", "created_at"),)
+
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey("booking.id"), nullable=False)
     rater_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -95,11 +123,35 @@ class Rating(db.Model):
     rated = db.relationship("User", foreign_keys=[rated_id], backref="ratings_received")
 
 
+def _adjust_rating_totals(connection, rating, sign):
+    users = User.__table__
+    connection.execute(
+        users.update()
+        .where(users.c.id == rating.rated_id)
+        .values(
+            rating_sum=db.func.coalesce(users.c.rating_sum, 0) + sign * rating.rating,
+            rating_count=db.func.coalesce(users.c.rating_count, 0) + sign,
+        )
+    )
+
+
+@db.event.listens_for(Rating, "after_insert")
+def _rating_inserted(mapper, connection, target):
+    _adjust_rating_totals(connection, target, 1)
+
+
+@db.event.listens_for(Rating, "after_delete")
+def _rating_deleted(mapper, connection, target):
+    _adjust_rating_totals(connection, target, -1)
+
+
 class SiteFeedback(db.Model):
     """Website experience feedback from users and drivers"""
 
     id = db.Column(db.Integer, primary_key=True)
-    booking_id = db.Column(db.Integer, db.ForeignKey("booking.id"), nullable=False)
+    booking_id = db.Column(
+        db.Integer, db.ForeignKey("booking.id"), nullable=False, index=True
+    )
     author_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     author_role = db.Column(db.String(20))
     rating = db.Column(db.Integer, nullable=False)
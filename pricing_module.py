@@ -3,17 +3,23 @@ ML-based pricing module using TRUCKBID-ACADEMIC RandomForest model
 Features: distance_km, truck_category, traffic_level, time_of_day, is_peak_hour
 Target: accepted_price_npr (price in Nepali Rupees)
 
+scikit-learn, joblib and pandas are imported only when the model is loaded
+or trained, so importing this module stays cheap until a price is needed.
+
 This module implements the exact same training and prediction logic from:
 https://github.com/KushG-1/TRUCKBID-ACADEMIC
 """
 
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-import random
+import glob
+import hashlib
+import itertools
+import os
+import pickle
+import tempfile
+import threading
 import warnings
+import zlib
 
 warnings.filterwarnings('ignore')
 
@@ -24,16 +30,16 @@ KTM_RATES = {
     "LARGE": {"rate": 35, "min": 1200, "max": 4000}
 }
 
-KATHMANDU_AREAS = [
-    "Baneshwor", "Koteshwor", "New Road", "Patan", "Bhaktapur",
-    "Kalanki", "Swayambhu", "Budhanilkantha", "Kirtipur", "Gaushala",
-    "Chabahil", "Thamel", "Maharajgunj", "Lazimpat", "Dillibazar"
-]
-
 # Global model and encoders
 _model = None
 _label_encoders = None
 _features = None
+# {column: {label: code}} mirror of _label_encoders for single-value lookups
+_category_codes = None
+# {(truck_cat, traffic_lev, time_period, is_peak_hour): ML context factor}
+_context_factors = None
+# Serializes the first model load across request threads
+_model_lock = threading.Lock()
 
 LABOR_COST = {
     "SMALL": 120.0,
@@ -68,17 +74,84 @@ TRAFFIC_MAP = {
 
 VALID_TIME_PERIODS = ["Morning", "Afternoon", "Evening", "Night"]
 
+# Runtime traffic multipliers used for the deterministic price
+RUNTIME_TRAFFIC_MULTIPLIERS = {
+    "Light": 1.0,
+    "Medium": 1.1,
+    "Heavy": 1.25,
+    "Very Heavy": 1.4,
+}
 
-def _normalize_time_period(time_of_day):
+# Guaranteed per-km growth of the distance fairness floor
+FLOOR_PER_KM = {
+    "SMALL": 40.0,
+    "MEDIUM": 60.0,
+    "LARGE": 85.0,
+}
+
+# Synthetic training data: traffic multipliers and time-of-day distribution
+TRAINING_TRAFFIC_MULTIPLIERS = {
+    "Light": 1.0,
+    "Medium": 1.1,
+    "Heavy": 1.3,
+    "Very Heavy": 1.5
+}
+TRAINING_TIME_WEIGHTS = [0.25, 0.35, 0.30, 0.10]
+TRAINING_SEED = 42
+
+# Closed label sets of the model's categorical features, so every encoder
+# knows all classes even if a sample happens to miss one
+CATEGORY_VOCABULARIES = {
+    'truck_category': sorted(KTM_RATES),
+    'traffic_level': sorted(TRAINING_TRAFFIC_MULTIPLIERS),
+    'time_of_day': sorted(VALID_TIME_PERIODS),
+}
+
+# With the ML context adjustment off, prices are purely deterministic and the
+# model (and scikit-learn) is never loaded
+ENABLE_ML_CONTEXT = os.environ.get('ENABLE_ML_CONTEXT', 'True') in ('True', 'true', '1')
+
+# Fitted models are cached here so worker processes load instead of retraining
+MODEL_CACHE_DIR = os.environ.get(
+    'PRICING_MODEL_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'truckbid'),
+)
+
+
+def parse_hour(time_of_day):
+    """Return the hour of an 'HH:MM' string, or None if it is not one."""
     if isinstance(time_of_day, str) and ':' in time_of_day:
-        hour = int(time_of_day.split(':')[0])
-        if 5 <= hour < 12:
-            return 'Morning'
-        if 12 <= hour < 17:
-            return 'Afternoon'
-        if 17 <= hour < 20:
-            return 'Evening'
-        return 'Night'
+        try:
+            return int(time_of_day.split(':', 1)[0])
+        except ValueError:
+            return None
+    return None
+
+
+def _bucket_time_period(hour):
+    if 5 <= hour < 12:
+        return 'Morning'
+    if 12 <= hour < 17:
+        return 'Afternoon'
+    if 17 <= hour < 20:
+        return 'Evening'
+    return 'Night'
+
+
+_TIME_PERIOD_BY_HOUR = tuple(_bucket_time_period(hour) for hour in range(24))
+
+
+def time_period_for_hour(hour):
+    """Map an hour of the day to one of VALID_TIME_PERIODS."""
+    if 0 <= hour < 24:
+        return _TIME_PERIOD_BY_HOUR[hour]
+    return 'Night'
+
+
+def _normalize_time_period(time_of_day):
+    hour = parse_hour(time_of_day)
+    if hour is not None:
+        return time_period_for_hour(hour)
 
     if time_of_day in VALID_TIME_PERIODS:
         return time_of_day
@@ -94,13 +167,7 @@ def _normalize_runtime_inputs(truck_category, traffic_level, time_of_day):
 
 def _get_runtime_factors(traffic_level, time_period, is_peak_hour):
     """Deterministic runtime multipliers for fair and explainable pricing."""
-    traffic_multipliers = {
-        "Light": 1.0,
-        "Medium": 1.1,
-        "Heavy": 1.25,
-        "Very Heavy": 1.4,
-    }
-    traffic_factor = traffic_multipliers.get(traffic_level, 1.1)
+    traffic_factor = RUNTIME_TRAFFIC_MULTIPLIERS.get(traffic_level, 1.1)
 
     peak_factor = 1.15 if is_peak_hour else 1.0
 
@@ -171,158 +238,224 @@ def _distance_fairness_floor(distance_km, truck_cat):
     # Industry-friendly floor profile: fixed short-trip base + guaranteed per-km growth.
     base_km = 2.0
     base_total = min_charge
-    per_km_floor = {
-        "SMALL": 40.0,
-        "MEDIUM": 60.0,
-        "LARGE": 85.0,
-    }
     extra_km = max(0.0, distance - base_km)
-    floor_total = base_total + (extra_km * per_km_floor.get(truck_cat, 60.0))
+    floor_total = base_total + (extra_km * FLOOR_PER_KM.get(truck_cat, 60.0))
     return float(min(floor_total, KTM_RATES[truck_cat]["max"]))
 
+
+def _lookup(keys, table, default):
+    """Map an array of category labels through a {label: value} table."""
+    keys = np.asarray(keys)
+    values = np.full(keys.shape, default, dtype=np.float64)
+    for label, value in table.items():
+        values[keys == label] = value
+    return values
+
+
+def _category_limits(truck_categories, key):
+    """Per-row KTM_RATES[category][key] for an array of vehicle categories."""
+    return _lookup(truck_categories, {cat: rates[key] for cat, rates in KTM_RATES.items()}, np.nan)
+
+
 def _calculate_base_price(distance_km, truck_category):
-    """Calculate realistic base price for Kathmandu"""
-    rate = KTM_RATES[truck_category]["rate"]
-    min_charge = KTM_RATES[truck_category]["min"]
-    base_price = distance_km * rate
-    if base_price < min_charge:
-        base_price = min_charge
-    return base_price
-
-def _apply_kathmandu_factors(base_price, factors):
-    """Apply Kathmandu-specific pricing factors"""
-    adjusted = base_price
+    """Calculate realistic base prices for Kathmandu (arrays of trips)"""
+    rate = _category_limits(truck_category, "rate")
+    min_charge = _category_limits(truck_category, "min")
+    return np.maximum(np.asarray(distance_km, dtype=np.float64) * rate, min_charge)
+
+def _apply_kathmandu_factors(base_price, factors, rng):
+    """Apply Kathmandu-specific pricing factors (arrays of trips)"""
+    adjusted = np.asarray(base_price, dtype=np.float64)
     
     # Traffic adjustments
-    traffic_multipliers = {
-        "Light": 1.0,
-        "Medium": 1.1,
-        "Heavy": 1.3,
-        "Very Heavy": 1.5
-    }
-    traffic = factors.get('traffic_level', 'Medium')
-    adjusted *= traffic_multipliers.get(traffic, 1.1)
+    adjusted = adjusted * _lookup(factors['traffic_level'], TRAINING_TRAFFIC_MULTIPLIERS, 1.1)
     
     # Peak hour adjustment
-    if factors.get('is_peak_hour', 0):
-        adjusted *= 1.2
+    adjusted = adjusted * np.where(np.asarray(factors['is_peak_hour']) != 0, 1.2, 1.0)
     
     # Time of day adjustments
-    time_of_day = factors.get('time_of_day', 'Afternoon')
-    if time_of_day == "Night":
-        adjusted *= 0.9
+    adjusted = adjusted * np.where(np.asarray(factors['time_of_day']) == "Night", 0.9, 1.0)
     
     # Distance-based adjustment
-    distance = factors.get('distance_km', 0)
-    if distance > 15:
-        adjusted *= 0.95
+    adjusted = adjusted * np.where(np.asarray(factors['distance_km']) > 15, 0.95, 1.0)
     
     # Add small randomness (±10%)
-    adjusted *= random.uniform(0.9, 1.1)
+    adjusted = adjusted * rng.uniform(0.9, 1.1, adjusted.shape)
     
     # Apply caps
-    truck_category = factors.get('truck_category', 'MEDIUM')
-    max_price = KTM_RATES[truck_category]["max"]
-    if adjusted > max_price:
-        adjusted = max_price
+    max_price = _category_limits(factors['truck_category'], "max")
+    adjusted = np.minimum(adjusted, max_price)
     
-    return round(adjusted, 2)
+    return adjusted.round(2)
+
+def _generate_training_columns(num_samples=500, seed=TRAINING_SEED):
+    """Generate Kathmandu dataset with REAL prices (from TRUCKBID) as NumPy columns"""
+    rng = np.random.default_rng(seed)
+
+    # Realistic distance (1-20km)
+    distances = rng.uniform(1.5, 18.5, num_samples).round(1)
+
+    # Truck distribution
+    truck_draw = rng.random(num_samples)
+    categories = np.where(truck_draw < 0.6, "SMALL", np.where(truck_draw < 0.9, "MEDIUM", "LARGE"))
+
+    # Time of day
+    time_of_day = rng.choice(VALID_TIME_PERIODS, size=num_samples, p=TRAINING_TIME_WEIGHTS)
+
+    # Peak hour
+    is_peak = np.isin(time_of_day, ["Morning", "Evening"]).astype(int)
+
+    # Traffic: heavy when congested or at peak, light at night, otherwise mixed
+    congested = rng.random(num_samples) > 0.7
+    heavy_traffic = rng.choice(["Heavy", "Very Heavy"], size=num_samples)
+    mixed_traffic = rng.choice(["Light", "Medium"], size=num_samples)
+    traffic = np.where(
+        congested | (is_peak == 1),
+        heavy_traffic,
+        np.where(time_of_day == "Night", "Light", mixed_traffic),
+    )
+
+    # Calculate base price
+    base_price = _calculate_base_price(distances, categories)
+
+    # Apply factors
+    factors = {
+        'traffic_level': traffic,
+        'is_peak_hour': is_peak,
+        'time_of_day': time_of_day,
+        'distance_km': distances,
+        'truck_category': categories
+    }
+    final_price = _apply_kathmandu_factors(base_price, factors, rng)
+
+    # Validate price
+    final_price = np.clip(
+        final_price,
+        _category_limits(categories, "min"),
+        _category_limits(categories, "max"),
+    )
+
+    return {
+        'truck_category': categories,
+        'distance_km': distances,
+        'traffic_level': traffic,
+        'time_of_day': time_of_day,
+        'is_peak_hour': is_peak,
+        'accepted_price_npr': final_price.round(2),
+    }
+
+def _generate_kathmandu_data(num_samples=500, seed=TRAINING_SEED):
+    """Generate Kathmandu dataset with REAL prices (from TRUCKBID) as a DataFrame"""
+    # Only the analysis notebook needs a DataFrame; training stays on NumPy
+    import pandas as pd
+
+    return pd.DataFrame(_generate_training_columns(num_samples, seed))
+
+def _model_cache_path():
+    """Cache file for the fitted model, keyed by this module's source and sklearn version."""
+    import sklearn
+
+    # The training constants and data generator live in this file, so any edit
+    # to them changes the key and forces a retrain.
+    with open(__file__, 'rb') as fh:
+        source = fh.read()
+    digest = hashlib.sha256(source + sklearn.__version__.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(MODEL_CACHE_DIR, f'pricing-{digest}.joblib')
+
+
+def _load_cached_model(path):
+    import joblib
+
+    try:
+        return joblib.load(path)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError, zlib.error):
+        # Missing, truncated or corrupt: retrain
+        return None
+
+
+def _prune_cached_models(keep):
+    """Delete model files left behind by earlier versions of this module."""
+    for stale in glob.glob(os.path.join(MODEL_CACHE_DIR, 'pricing-*.joblib')):
+        if stale != keep:
+            try:
+                os.unlink(stale)
+            except OSError:
+                pass
+
+
+def _save_cached_model(path, artifact):
+    import joblib
+
+    try:
+        # Cached models are unpickled on load, so keep the directory private
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    except OSError:
+        # Unwritable cache directory: keep serving from the in-memory model
+        return
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            joblib.dump(artifact, fh, compress=3)
+        # Atomic rename so concurrently starting workers never read a partial file
+        os.replace(tmp_path, path)
+    except OSError:
+        os.unlink(tmp_path)
+        return
+    _prune_cached_models(keep=path)
 
-def _generate_kathmandu_data(num_samples=500):
-    """Generate Kathmandu dataset with REAL prices (from TRUCKBID)"""
-    data = []
-    
-    for _ in range(num_samples):
-        pickup = random.choice(KATHMANDU_AREAS)
-        delivery = random.choice([a for a in KATHMANDU_AREAS if a != pickup])
-        
-        # Realistic distance (1-20km)
-        distance = round(random.uniform(1.5, 18.5), 1)
-        
-        # Truck distribution
-        rand = random.random()
-        if rand < 0.6:
-            category = "SMALL"
-        elif rand < 0.9:
-            category = "MEDIUM"
-        else:
-            category = "LARGE"
-        
-        # Time of day
-        time_options = ["Morning", "Afternoon", "Evening", "Night"]
-        time_weights = [0.25, 0.35, 0.30, 0.10]
-        time_of_day = random.choices(time_options, weights=time_weights)[0]
-        
-        # Peak hour
-        is_peak = 1 if time_of_day in ["Morning", "Evening"] else 0
-        
-        # Traffic
-        if random.random() > 0.7:
-            traffic = random.choice(["Heavy", "Very Heavy"])
-        elif is_peak:
-            traffic = random.choice(["Heavy", "Very Heavy"])
-        elif time_of_day == "Night":
-            traffic = "Light"
-        else:
-            traffic = random.choice(["Light", "Medium"])
-        
-        # Calculate base price
-        base_price = _calculate_base_price(distance, category)
-        
-        # Apply factors
-        factors = {
-            'traffic_level': traffic,
-            'is_peak_hour': is_peak,
-            'time_of_day': time_of_day,
-            'distance_km': distance,
-            'truck_category': category
-        }
-        final_price = _apply_kathmandu_factors(base_price, factors)
-        
-        # Validate price
-        if final_price < KTM_RATES[category]["min"]:
-            final_price = KTM_RATES[category]["min"]
-        if final_price > KTM_RATES[category]["max"]:
-            final_price = KTM_RATES[category]["max"]
-        
-        record = {
-            'truck_category': category,
-            'distance_km': distance,
-            'traffic_level': traffic,
-            'time_of_day': time_of_day,
-            'is_peak_hour': is_peak,
-            'accepted_price_npr': round(final_price, 2),
-        }
-        data.append(record)
-    
-    return pd.DataFrame(data)
 
 def _train_pricing_model():
+    """Load the cached RandomForest model, training it (TRUCKBID-ACADEMIC structure) if absent"""
+    global _model, _label_encoders, _features, _category_codes, _context_factors
+
+    cache_path = _model_cache_path()
+    artifact = _load_cached_model(cache_path)
+    if artifact is None:
+        artifact = _fit_pricing_model()
+        _save_cached_model(cache_path, artifact)
+
+    model, label_encoders, features = artifact
+    category_codes = {
+        col: {label: code for code, label in enumerate(le.classes_)}
+        for col, le in label_encoders.items()
+    }
+    context_factors = _build_context_factors(model, category_codes)
+
+    _model, _label_encoders, _features = model, label_encoders, features
+    _category_codes = category_codes
+    # Assigned last: warm_up() treats a non-None table as "fully loaded"
+    _context_factors = context_factors
+
+    return model, label_encoders, features
+
+
+def _fit_pricing_model():
     """Train the RandomForest model (TRUCKBID-ACADEMIC structure)"""
-    global _model, _label_encoders, _features
-    
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder
+
     # Generate training data
-    df = _generate_kathmandu_data(500)
+    columns = _generate_training_columns(500)
     
     # Define features and target
-    _features = ['distance_km', 'truck_category', 'traffic_level', 'time_of_day', 'is_peak_hour']
-    X = df[_features].copy()
-    y = df['accepted_price_npr']
+    features = ['distance_km', 'truck_category', 'traffic_level', 'time_of_day', 'is_peak_hour']
+    y = columns['accepted_price_npr']
     
     # Encode categorical variables
-    _label_encoders = {}
-    categorical_cols = ['truck_category', 'traffic_level', 'time_of_day']
+    label_encoders = {}
     
-    for col in categorical_cols:
-        le = LabelEncoder()
-        X[col] = pd.Series(le.fit_transform(X[col]), index=X.index)
-        _label_encoders[col] = le
+    for col, vocabulary in CATEGORY_VOCABULARIES.items():
+        le = LabelEncoder().fit(vocabulary)
+        columns[col] = le.transform(columns[col])
+        label_encoders[col] = le
+    X = np.column_stack([columns[col] for col in features])
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     # Train model
-    _model = RandomForestRegressor(
+    model = RandomForestRegressor(
         n_estimators=100,
         max_depth=10,
         min_samples_split=5,
@@ -330,9 +463,22 @@ def _train_pricing_model():
         random_state=42,
         n_jobs=-1
     )
-    _model.fit(X_train, y_train)
+    model.fit(X_train, y_train)
+    # Predictions are single rows; thread dispatch would cost more than the tree walk
+    model.n_jobs = 1
     
-    return _model, _label_encoders, _features
+    return model, label_encoders, features
+
+def warm_up():
+    """Train the model now so the first price estimate does not pay for it."""
+    if not ENABLE_ML_CONTEXT or _context_factors is not None:
+        return
+    # Threaded workers can all see an unloaded model on their first requests;
+    # only one of them loads it, the rest wait and reuse the result.
+    with _model_lock:
+        if _context_factors is None:
+            _train_pricing_model()
+
 
 def predict_price(distance_km, truck_category, traffic_level, time_of_day, is_peak_hour):
     """
@@ -348,17 +494,6 @@ def predict_price(distance_km, truck_category, traffic_level, time_of_day, is_pe
     Returns:
         float - predicted price in Nepali Rupees
     """
-    global _model, _label_encoders, _features
-    
-    # Initialize model if not already trained
-    if _model is None:
-        _model, _label_encoders, _features = _train_pricing_model()
-    
-    # Type assertion (Pylance)
-    assert _label_encoders is not None, "Label encoders not initialized"
-    assert _model is not None, "Model not initialized"
-    assert _features is not None, "Features not initialized"
-    
     details = estimate_price_details(
         distance_km=distance_km,
         truck_category=truck_category,
@@ -369,26 +504,128 @@ def predict_price(distance_km, truck_category, traffic_level, time_of_day, is_pe
     return int(round(details["final_price"]))
 
 
-def estimate_price_details(distance_km, truck_category, traffic_level, time_of_day, is_peak_hour):
-    """Return final price plus transparent pricing breakdown."""
-    global _model, _label_encoders, _features
+def _build_context_factors(model, category_codes):
+    """
+    ML market adjustment for every pricing context, independent of trip distance.
 
-    if _model is None:
-        _model, _label_encoders, _features = _train_pricing_model()
+    There are only 96 (vehicle, traffic, time, peak) contexts, so the forest
+    scores them all in one batch when the model is loaded.
+    """
+    contexts = list(itertools.product(
+        KTM_RATES,
+        TRAINING_TRAFFIC_MULTIPLIERS,
+        VALID_TIME_PERIODS,
+        (0, 1),
+    ))
 
-    assert _label_encoders is not None, "Label encoders not initialized"
-    assert _model is not None, "Model not initialized"
-    assert _features is not None, "Features not initialized"
+    # ML context factor at fixed reference distance to preserve monotonic distance behavior
+    reference_distance = 5.0
+    ref_features = np.array([
+        [
+            reference_distance,
+            category_codes['truck_category'][truck_cat],
+            category_codes['traffic_level'][traffic_lev],
+            category_codes['time_of_day'][time_period],
+            is_peak_hour,
+        ]
+        for truck_cat, traffic_lev, time_period, is_peak_hour in contexts
+    ])
+    ml_refs = model.predict(ref_features).tolist()
+
+    factors = {}
+    for context, ml_ref in zip(contexts, ml_refs):
+        truck_cat, traffic_lev, time_period, is_peak_hour = context
+        deterministic_ref = _deterministic_price(
+            distance_km=reference_distance,
+            truck_cat=truck_cat,
+            traffic_level=traffic_lev,
+            time_period=time_period,
+            is_peak_hour=is_peak_hour,
+        )
+
+        if deterministic_ref > 0:
+            context_factor = ml_ref / deterministic_ref
+        else:
+            context_factor = 1.0
+
+        # Keep ML influence but prevent extreme distortions
+        factors[context] = float(np.clip(context_factor, 0.98, 1.08))
+    return factors
+
+
+def _context_factor(truck_cat, traffic_lev, time_period, is_peak_hour):
+    """Precomputed ML market adjustment for a normalized pricing context."""
+    if not ENABLE_ML_CONTEXT:
+        return 1.0
+    return _context_factors[(truck_cat, traffic_lev, time_period, 1 if is_peak_hour else 0)]
+
+
+def _combine_price(deterministic, context_factor, fair_floor, truck_cat):
+    """Apply the context factor, then the fairness floor and category limits."""
+    hybrid_price = deterministic * context_factor
+    min_charge = KTM_RATES[truck_cat]['min']
+    max_price = KTM_RATES[truck_cat]['max']
+    final_price = max(hybrid_price, fair_floor, min_charge)
+    return min(final_price, max_price)
+
+
+def predict_prices(distances, truck_category, traffic_level, time_of_day, is_peak_hour):
+    """
+    Predict prices for several distances that share one vehicle/traffic/time context.
+
+    The ML context factor does not depend on distance, so one precomputed factor
+    serves the whole batch. Each price equals predict_price() for that distance.
+    """
+    warm_up()
 
     truck_cat, traffic_lev, time_period = _normalize_runtime_inputs(
         truck_category,
         traffic_level,
         time_of_day,
     )
+    context_factor = _context_factor(truck_cat, traffic_lev, time_period, is_peak_hour)
+
+    # For a fixed context the price is piecewise linear in distance, so the
+    # whole batch is evaluated with array operations in the same order as
+    # _deterministic_breakdown, _distance_fairness_floor and _combine_price.
+    distance = np.maximum(np.asarray(distances, dtype=np.float64), 0.0)
+    min_charge = KTM_RATES[truck_cat]["min"]
+    max_charge = KTM_RATES[truck_cat]["max"]
+    traffic_factor, peak_factor, time_factor = _get_runtime_factors(
+        traffic_lev,
+        time_period,
+        is_peak_hour,
+    )
+    subtotal = (
+        distance * KTM_RATES[truck_cat]["rate"]
+        + distance * FUEL_MAINTENANCE_PER_KM.get(truck_cat, 10.0)
+        + LABOR_COST.get(truck_cat, 180.0)
+        + SERVICE_FEE.get(truck_cat, 120.0)
+    )
+    deterministic = np.minimum(
+        np.maximum(subtotal * (traffic_factor * peak_factor * time_factor), min_charge),
+        max_charge,
+    )
+    fair_floor = np.minimum(
+        min_charge + np.maximum(0.0, distance - 2.0) * FLOOR_PER_KM.get(truck_cat, 60.0),
+        max_charge,
+    )
+    final_prices = np.minimum(
+        np.maximum(np.maximum(deterministic * context_factor, fair_floor), min_charge),
+        max_charge,
+    )
+    return [int(round(round(price, 2))) for price in final_prices.tolist()]
+
 
-    truck_encoded = _label_encoders['truck_category'].transform([truck_cat])[0]
-    traffic_encoded = _label_encoders['traffic_level'].transform([traffic_lev])[0]
-    time_encoded = _label_encoders['time_of_day'].transform([time_period])[0]
+def estimate_price_details(distance_km, truck_category, traffic_level, time_of_day, is_peak_hour):
+    """Return final price plus transparent pricing breakdown."""
+    warm_up()
+
+    truck_cat, traffic_lev, time_period = _normalize_runtime_inputs(
+        truck_category,
+        traffic_level,
+        time_of_day,
+    )
 
     # Deterministic baseline (fair distance scaling)
     breakdown = _deterministic_breakdown(
@@ -400,33 +637,9 @@ def estimate_price_details(distance_km, truck_category, traffic_level, time_of_d
     )
     deterministic = breakdown["deterministic_total"]
 
-    # ML context factor at fixed reference distance to preserve monotonic distance behavior
-    reference_distance = 5.0
-    ref_features = np.array([[reference_distance, truck_encoded, traffic_encoded, time_encoded, is_peak_hour]])
-    ml_ref = float(_model.predict(ref_features)[0])
-    deterministic_ref = _deterministic_price(
-        distance_km=reference_distance,
-        truck_cat=truck_cat,
-        traffic_level=traffic_lev,
-        time_period=time_period,
-        is_peak_hour=is_peak_hour,
-    )
-
-    if deterministic_ref > 0:
-        context_factor = ml_ref / deterministic_ref
-    else:
-        context_factor = 1.0
-
-    # Keep ML influence but prevent extreme distortions
-    context_factor = float(np.clip(context_factor, 0.98, 1.08))
-    hybrid_price = deterministic * context_factor
-
+    context_factor = _context_factor(truck_cat, traffic_lev, time_period, is_peak_hour)
     fair_floor = _distance_fairness_floor(distance_km, truck_cat)
-
-    min_charge = KTM_RATES[truck_cat]['min']
-    max_price = KTM_RATES[truck_cat]['max']
-    final_price = max(hybrid_price, fair_floor, min_charge)
-    final_price = min(final_price, max_price)
+    final_price = _combine_price(deterministic, context_factor, fair_floor, truck_cat)
 
     return {
         "final_price": float(round(final_price, 2)),
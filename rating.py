@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload
 from models import db, User, Booking, Rating, SiteFeedback
+from extensions import invalidate_site_feedbacks
 from datetime import datetime
 
 rating_bp = Blueprint("rating", __name__)
@@ -69,6 +71,7 @@ def rate_driver(booking_id):
             db.session.add(site_feedback)
 
         db.session.commit()
+        invalidate_site_feedbacks()
 
         flash(
             "Thank you for rating your driver and sharing website feedback!", "success"
@@ -141,6 +144,7 @@ def rate_user(booking_id):
             db.session.add(site_feedback)
 
         db.session.commit()
+        invalidate_site_feedbacks()
 
         flash(
             "Thank you for rating your customer and sharing website feedback!",
@@ -158,10 +162,11 @@ def view_ratings(user_id):
     user = User.query.get_or_404(user_id)
     ratings = (
         Rating.query.filter_by(rated_id=user_id)
+        .options(selectinload(Rating.rater), selectinload(Rating.booking))
         .order_by(Rating.created_at.desc())
         .all()
     )
-    avg_rating = sum(r.rating for r in ratings) / len(ratings) if ratings else 0
+    avg_rating, _ = user.get_rating_summary()
     return render_template(
         "view_ratings.html", user=user, ratings=ratings, avg_rating=avg_rating
     )
@@ -172,8 +177,7 @@ def view_ratings(user_id):
 def user_stats(user_id):
     """API endpoint to get user/driver statistics."""
     user = User.query.get_or_404(user_id)
-    ratings = Rating.query.filter_by(rated_id=user_id).all()
-    avg_rating = sum(r.rating for r in ratings) / len(ratings) if ratings else 0
+    avg_rating, total_ratings = user.get_rating_summary()
 
     if user.role == "driver":
         total_deliveries = Booking.query.filter_by(
@@ -190,7 +194,7 @@ def user_stats(user_id):
             "username": user.username,
             "role": user.role,
             "avg_rating": round(avg_rating, 2),
-            "total_ratings": len(ratings),
+            "total_ratings": total_ratings,
             "total_deliveries": total_deliveries,
         }
     )
@@ -1,20 +1,53 @@
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload, selectinload
+from extensions import HOME_FEEDBACKS_CACHE_KEY, cache
 from models import Booking, SiteFeedback
 
 main_bp = Blueprint("main", __name__)
 
 
+@cache.cached(timeout=60, key_prefix=HOME_FEEDBACKS_CACHE_KEY)
+def latest_site_feedbacks():
+    """The six newest testimonials for the home page, as plain dicts so they cache."""
+    feedbacks = (
+        SiteFeedback.query.options(joinedload(SiteFeedback.author))
+        .order_by(SiteFeedback.created_at.desc())
+        .limit(6)
+        .all()
+    )
+    return [
+        {
+            "author_role": fb.author_role,
+            "rating": fb.rating,
+            "feedback": fb.feedback,
+            "booking_id": fb.booking_id,
+            "author": {
+                "username": fb.author.username,
+                "full_name": fb.author.full_name,
+                "profile_pic": fb.author.profile_pic,
+            }
+            if fb.author
+            else None,
+        }
+        for fb in feedbacks
+    ]
+
+
 @main_bp.route("/")
 def home():
-    feedbacks = SiteFeedback.query.order_by(SiteFeedback.created_at.desc()).limit(6).all()
-    return render_template("home.html", site_feedbacks=feedbacks)
+    return render_template("home.html", site_feedbacks=latest_site_feedbacks())
 
 
 @main_bp.route("/profile")
 @login_required
 def profile():
-    bookings = Booking.query.filter_by(user_id=current_user.id).all()
+    # The page lists every booking with its driver, so load drivers in one query
+    bookings = (
+        Booking.query.filter_by(user_id=current_user.id)
+        .options(selectinload(Booking.driver))
+        .all()
+    )
     return render_template("profile.html", bookings=bookings)
 
 
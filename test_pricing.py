@@ -1,4 +1,4 @@
-from pricing_module import predict_price
+from pricing_module import predict_price, predict_prices
 
 print("\n" + "="*80)
 print("ML PRICING MODEL TEST - DISTANCE IMPACT ANALYSIS")
@@ -8,22 +8,22 @@ print("="*80)
 print("\n[TEST 1] SMALL TRUCK - Light Traffic - Afternoon (No Peak)")
 print("-" * 80)
 test_distances = [3, 5, 10, 15, 20, 25, 30]
-for dist in test_distances:
-    price = predict_price(dist, "small_vehicle", "light", "Afternoon", 0)
+prices = predict_prices(test_distances, "small_vehicle", "light", "Afternoon", 0)
+for dist, price in zip(test_distances, prices):
     print(f"Distance: {dist:2d} km → Price: Rs {price:7.2f}")
 
 # Test 2: Medium truck, medium traffic, morning, PEAK HOUR
 print("\n[TEST 2] MEDIUM TRUCK - Medium Traffic - Morning (PEAK HOUR)")
 print("-" * 80)
-for dist in test_distances:
-    price = predict_price(dist, "medium_vehicle", "medium", "Morning", 1)
+prices = predict_prices(test_distances, "medium_vehicle", "medium", "Morning", 1)
+for dist, price in zip(test_distances, prices):
     print(f"Distance: {dist:2d} km → Price: Rs {price:7.2f}")
 
 # Test 3: Large truck, heavy traffic, evening, no peak
 print("\n[TEST 3] LARGE TRUCK - Heavy Traffic - Evening (No Peak)")
 print("-" * 80)
-for dist in test_distances:
-    price = predict_price(dist, "large_vehicle", "heavy", "Evening", 0)
+prices = predict_prices(test_distances, "large_vehicle", "heavy", "Evening", 0)
+for dist, price in zip(test_distances, prices):
     print(f"Distance: {dist:2d} km → Price: Rs {price:7.2f}")
 
 # Test 4: Same distance, different vehicle types
@@ -0,0 +1,20 @@
+"""Upload storage shared by the auth and driver blueprints."""
+import os
+
+from werkzeug.utils import secure_filename
+
+UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "static", "uploads")
+# Copy uploads to disk in 1 MiB chunks (Werkzeug defaults to 16 KiB).
+UPLOAD_BUFFER_SIZE = 1 << 20
+
+
+def save_upload(file_storage, prefix):
+    """Store an uploaded file as '<prefix>_<name>' and return its static URL."""
+    if not file_storage or not getattr(file_storage, "filename", None):
+        return None
+    filename = secure_filename(file_storage.filename)
+    name, ext = os.path.splitext(filename)
+    safe_name = f"{prefix}_{name}{ext}"
+    dest = os.path.join(UPLOAD_FOLDER, safe_name)
+    file_storage.save(dest, buffer_size=UPLOAD_BUFFER_SIZE)
+    return f"/static/uploads/{safe_name}"